@@ -40,7 +40,15 @@ class PyTest(test.test):
 
     def finalize_options(self):
         test.test.finalize_options(self)
-        self.test_args = ['-x', "tests/mobly"]
+        # Unit tests are independent of each other, so spread them across all
+        # available cores. `loadfile` keeps each test module on one worker
+        # since logcat_test's tests share log files under /tmp/logs.
+        # The pytest cache only helps interactive runs, e.g. with `--lf`, so
+        # don't read or write it here.
+        self.test_args = [
+            '-x', '-n', 'auto', '--dist=loadfile', '-p', 'no:cacheprovider',
+            "tests/mobly"
+        ]
         self.test_suite = True
 
     def run_tests(self):
@@ -66,6 +74,7 @@ def main():
             'mock',
             # Needed for supporting Python 2 because this release stopped supporting Python 2.
             'pytest<5.0.0',
+            'pytest-xdist<2.0.0',
             'pytz',
         ],
         install_requires=install_requires,
@@ -20,6 +20,17 @@ import mock
 import os
 
 
+# Device properties reported by every MockAdbProxy. Shared by all instances,
+# so it must not be modified.
+_MOCK_PROPERTIES = {
+    "ro.build.id": "AB42",
+    "ro.build.type": "userdebug",
+    "ro.build.product": "FakeModel",
+    "ro.product.name": "FakeModel",
+    "sys.boot_completed": "1"
+}
+
+
 class Error(Exception):
     pass
 
@@ -68,13 +79,7 @@ class MockAdbProxy(object):
         self.serial = serial
         self.fail_br = fail_br
         self.fail_br_before_N = fail_br_before_N
-        self.mock_properties = {
-            "ro.build.id": "AB42",
-            "ro.build.type": "userdebug",
-            "ro.build.product": "FakeModel",
-            "ro.product.name": "FakeModel",
-            "sys.boot_completed": "1"
-        }
+        self.mock_properties = _MOCK_PROPERTIES
 
     def shell(self, params, timeout=None):
         if params == "id -u":
@@ -106,6 +111,10 @@ class MockAdbProxy(object):
         """All calls to the none-existent functions in adb proxy would
         simply return the adb command string.
         """
+        # Special attributes are looked up by protocols like `copy`, they are
+        # not adb commands.
+        if name.startswith('__'):
+            raise AttributeError(name)
 
         def adb_call(*args, **kwargs):
             arg_str = ' '.join(str(elem) for elem in args)
@@ -124,6 +133,9 @@ class MockFastbootProxy(object):
         return b"xxxx device\nyyyy device"
 
     def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
         def fastboot_call(*args):
             arg_str = ' '.join(str(elem) for elem in args)
             return arg_str
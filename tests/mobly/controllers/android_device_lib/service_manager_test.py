@@ -13,7 +13,7 @@
 # limitations under the License.
 """Unit tests for Mobly's ServiceManager."""
 import mock
-import sys
+import re
 
 from future.tests.base import unittest
 
@@ -21,28 +21,57 @@ from mobly import expects
 from mobly.controllers.android_device_lib import service_manager
 from mobly.controllers.android_device_lib.services import base_service
 
+# `ServiceManager` only passes the device object around, so all tests can
+# share one plain mock without any attributes or magic methods.
+_MOCK_DEVICE = mock.Mock(spec_set=[])
+
+# Patterns of the errors raised by `ServiceManager`.
+_NOT_A_CLASS_RE = re.compile('.* is not a class!')
+_NOT_A_SUBCLASS_RE = re.compile('.* is not a subclass of BaseService!')
+_DUP_ALIAS_RE = re.compile(
+    '.* A service is already registered with alias "mock_service"')
+_NO_SERVICE_RE = re.compile(
+    '.* No service is registered with alias "mock_service"')
+
+
+class MockFunction(object):
+    """Lightweight replacement of `mock.MagicMock` that only counts calls.
+
+    If `side_effect` is set to an exception, it is raised on each call.
+    """
+
+    def __init__(self):
+        self.call_count = 0
+        self.side_effect = None
+
+    def __call__(self, *args, **kwargs):
+        self.call_count += 1
+        if self.side_effect is not None:
+            raise self.side_effect
+
 
 class MockService(base_service.BaseService):
+    # `is_alive` is a plain slot here, which overrides the property defined
+    # in `BaseService`.
+    __slots__ = ('_device', '_configs', 'is_alive', 'start_func', 'stop_func',
+                 'pause_func', 'resume_func')
+
     def __init__(self, device, configs=None):
         self._device = device
         self._configs = configs
-        self._alive = False
-        self.start_func = mock.MagicMock()
-        self.stop_func = mock.MagicMock()
-        self.pause_func = mock.MagicMock()
-        self.resume_func = mock.MagicMock()
-
-    @property
-    def is_alive(self):
-        return self._alive
+        self.is_alive = False
+        self.start_func = MockFunction()
+        self.stop_func = MockFunction()
+        self.pause_func = MockFunction()
+        self.resume_func = MockFunction()
 
     def start(self, configs=None):
         self.start_func(configs)
-        self._alive = True
+        self.is_alive = True
 
     def stop(self):
         self.stop_func()
-        self._alive = False
+        self.is_alive = False
 
     def pause(self):
         self.pause_func()
@@ -53,178 +82,161 @@ class MockService(base_service.BaseService):
 
 class ServiceManagerTest(unittest.TestCase):
     def setUp(self):
-        # Reset hidden global `expects` state.
-        if sys.version_info < (3, 0):
-            reload(expects)
-        else:
-            import importlib
-            importlib.reload(expects)
+        # Reset hidden global `expects` state. Clearing it in place is much
+        # cheaper than reloading the module.
+        expects.DEFAULT_TEST_RESULT_RECORD.extra_errors.clear()
+        expects.recorder.reset_internal_states(
+            expects.DEFAULT_TEST_RESULT_RECORD)
+        self.manager = service_manager.ServiceManager(_MOCK_DEVICE)
+
+    def register_two_services(self, start_service1=True,
+                              start_service2=True):
+        """Registers two `MockService` instances with the manager.
+
+        Args:
+            start_service1: bool, whether to start the first service.
+            start_service2: bool, whether to start the second service.
+
+        Returns:
+            A tuple of the two registered services.
+        """
+        self.manager.register(
+            'mock_service1', MockService, start_service=start_service1)
+        self.manager.register(
+            'mock_service2', MockService, start_service=start_service2)
+        return self.manager.mock_service1, self.manager.mock_service2
 
     def assert_recorded_one_error(self, message):
         self.assertEqual(expects.recorder.error_count, 1)
-        for _, error in (
-                expects.DEFAULT_TEST_RESULT_RECORD.extra_errors.items()):
-            self.assertIn(message, error.details)
+        errors = expects.DEFAULT_TEST_RESULT_RECORD.extra_errors
+        error = next(iter(errors.values()))
+        self.assertIn(message, error.details)
 
     def test_service_manager_instantiation(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
+        service_manager.ServiceManager(_MOCK_DEVICE)
 
     def test_register(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service', MockService)
-        service = manager.mock_service
+        self.manager.register('mock_service', MockService)
+        service = self.manager.mock_service
         self.assertTrue(service)
         self.assertTrue(service.is_alive)
-        self.assertTrue(manager.is_any_alive)
+        self.assertTrue(self.manager.is_any_alive)
         self.assertEqual(service.start_func.call_count, 1)
 
     def test_register_with_configs(self):
         mock_configs = mock.MagicMock()
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service', MockService, configs=mock_configs)
-        service = manager.mock_service
+        self.manager.register(
+            'mock_service', MockService, configs=mock_configs)
+        service = self.manager.mock_service
         self.assertTrue(service)
         self.assertEqual(service._configs, mock_configs)
         self.assertEqual(service.start_func.call_count, 1)
 
     def test_register_do_not_start_service(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service', MockService, start_service=False)
-        service = manager.mock_service
+        self.manager.register('mock_service', MockService, start_service=False)
+        service = self.manager.mock_service
         self.assertTrue(service)
         self.assertFalse(service.is_alive)
-        self.assertFalse(manager.is_any_alive)
+        self.assertFalse(self.manager.is_any_alive)
         self.assertEqual(service.start_func.call_count, 0)
 
     def test_register_not_a_class(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        with self.assertRaisesRegex(service_manager.Error,
-                                    '.* is not a class!'):
-            manager.register('mock_service', base_service)
+        with self.assertRaisesRegex(service_manager.Error, _NOT_A_CLASS_RE):
+            self.manager.register('mock_service', base_service)
 
     def test_register_wrong_subclass_type(self):
         class MyClass(object):
             pass
 
-        manager = service_manager.ServiceManager(mock.MagicMock())
         with self.assertRaisesRegex(service_manager.Error,
-                                    '.* is not a subclass of BaseService!'):
-            manager.register('mock_service', MyClass)
+                                    _NOT_A_SUBCLASS_RE):
+            self.manager.register('mock_service', MyClass)
 
     def test_register_dup_alias(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service', MockService)
-        msg = '.* A service is already registered with alias "mock_service"'
-        with self.assertRaisesRegex(service_manager.Error, msg):
-            manager.register('mock_service', MockService)
+        self.manager.register('mock_service', MockService)
+        with self.assertRaisesRegex(service_manager.Error, _DUP_ALIAS_RE):
+            self.manager.register('mock_service', MockService)
 
     def test_unregister(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service', MockService)
-        service = manager.mock_service
-        manager.unregister('mock_service')
-        self.assertFalse(manager.is_any_alive)
+        self.manager.register('mock_service', MockService)
+        service = self.manager.mock_service
+        self.manager.unregister('mock_service')
+        self.assertFalse(self.manager.is_any_alive)
         self.assertFalse(service.is_alive)
         self.assertEqual(service.stop_func.call_count, 1)
 
     def test_unregister_not_started_service(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service', MockService, start_service=False)
-        service = manager.mock_service
-        manager.unregister('mock_service')
-        self.assertFalse(manager.is_any_alive)
+        self.manager.register('mock_service', MockService, start_service=False)
+        service = self.manager.mock_service
+        self.manager.unregister('mock_service')
+        self.assertFalse(self.manager.is_any_alive)
         self.assertFalse(service.is_alive)
         self.assertEqual(service.stop_func.call_count, 0)
 
     def test_unregister_non_existent(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        with self.assertRaisesRegex(
-                service_manager.Error,
-                '.* No service is registered with alias "mock_service"'):
-            manager.unregister('mock_service')
+        with self.assertRaisesRegex(service_manager.Error, _NO_SERVICE_RE):
+            self.manager.unregister('mock_service')
 
     def test_unregister_handle_error_from_stop(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service', MockService)
-        service = manager.mock_service
+        self.manager.register('mock_service', MockService)
+        service = self.manager.mock_service
         service.stop_func.side_effect = Exception('Something failed in stop.')
-        manager.unregister('mock_service')
+        self.manager.unregister('mock_service')
         self.assert_recorded_one_error(
             'Failed to stop service instance "mock_service".')
 
     def test_unregister_all(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.unregister_all()
-        self.assertFalse(manager.is_any_alive)
+        service1, service2 = self.register_two_services()
+        self.manager.unregister_all()
+        self.assertFalse(self.manager.is_any_alive)
         self.assertFalse(service1.is_alive)
         self.assertFalse(service2.is_alive)
         self.assertEqual(service1.stop_func.call_count, 1)
         self.assertEqual(service2.stop_func.call_count, 1)
 
     def test_unregister_all_with_some_failed(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
+        service1, service2 = self.register_two_services()
         service1.stop_func.side_effect = Exception('Something failed in stop.')
-        service2 = manager.mock_service2
-        manager.unregister_all()
-        self.assertFalse(manager.is_any_alive)
+        self.manager.unregister_all()
+        self.assertFalse(self.manager.is_any_alive)
         self.assertTrue(service1.is_alive)
         self.assertFalse(service2.is_alive)
         self.assert_recorded_one_error(
             'Failed to stop service instance "mock_service1".')
 
     def test_start_all(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService, start_service=False)
-        manager.register('mock_service2', MockService, start_service=False)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.start_all()
+        service1, service2 = self.register_two_services(
+            start_service1=False, start_service2=False)
+        self.manager.start_all()
         self.assertTrue(service1.is_alive)
         self.assertTrue(service2.is_alive)
         self.assertEqual(service1.start_func.call_count, 1)
         self.assertEqual(service2.start_func.call_count, 1)
 
     def test_start_all_with_already_started_services(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService, start_service=False)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.start_all()
-        manager.start_all()
+        service1, service2 = self.register_two_services(
+            start_service2=False)
+        self.manager.start_all()
+        self.manager.start_all()
         self.assertTrue(service1.is_alive)
         self.assertTrue(service2.is_alive)
         self.assertEqual(service1.start_func.call_count, 1)
         self.assertEqual(service2.start_func.call_count, 1)
 
     def test_start_all_with_some_failed(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService, start_service=False)
-        manager.register('mock_service2', MockService, start_service=False)
-        service1 = manager.mock_service1
+        service1, service2 = self.register_two_services(
+            start_service1=False, start_service2=False)
         service1.start_func.side_effect = Exception(
             'Something failed in start.')
-        service2 = manager.mock_service2
-        manager.start_all()
+        self.manager.start_all()
         self.assertFalse(service1.is_alive)
         self.assertTrue(service2.is_alive)
         self.assert_recorded_one_error(
             'Failed to start service "mock_service1"')
 
     def test_stop_all(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.stop_all()
+        service1, service2 = self.register_two_services()
+        self.manager.stop_all()
         self.assertFalse(service1.is_alive)
         self.assertFalse(service2.is_alive)
         self.assertEqual(service1.start_func.call_count, 1)
@@ -233,13 +245,10 @@ class ServiceManagerTest(unittest.TestCase):
         self.assertEqual(service2.stop_func.call_count, 1)
 
     def test_stop_all_with_already_stopped_services(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService, start_service=False)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.stop_all()
-        manager.stop_all()
+        service1, service2 = self.register_two_services(
+            start_service2=False)
+        self.manager.stop_all()
+        self.manager.stop_all()
         self.assertFalse(service1.is_alive)
         self.assertFalse(service2.is_alive)
         self.assertEqual(service1.start_func.call_count, 1)
@@ -248,31 +257,23 @@ class ServiceManagerTest(unittest.TestCase):
         self.assertEqual(service2.stop_func.call_count, 0)
 
     def test_stop_all_with_some_failed(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
-        service1.stop_func.side_effect = Exception(
-            'Something failed in start.')
-        service2 = manager.mock_service2
-        manager.stop_all()
+        service1, service2 = self.register_two_services()
+        service1.stop_func.side_effect = Exception('Something failed in stop.')
+        self.manager.stop_all()
         self.assertTrue(service1.is_alive)
         self.assertFalse(service2.is_alive)
         self.assert_recorded_one_error(
             'Failed to stop service "mock_service1"')
 
     def test_start_all_and_stop_all_serveral_times(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService, start_service=False)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.stop_all()
-        manager.start_all()
-        manager.stop_all()
-        manager.start_all()
-        manager.stop_all()
-        manager.start_all()
+        service1, service2 = self.register_two_services(
+            start_service2=False)
+        self.manager.stop_all()
+        self.manager.start_all()
+        self.manager.stop_all()
+        self.manager.start_all()
+        self.manager.stop_all()
+        self.manager.start_all()
         self.assertTrue(service1.is_alive)
         self.assertTrue(service2.is_alive)
         self.assertEqual(service1.start_func.call_count, 4)
@@ -281,26 +282,18 @@ class ServiceManagerTest(unittest.TestCase):
         self.assertEqual(service2.stop_func.call_count, 2)
 
     def test_pause_all(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.pause_all()
+        service1, service2 = self.register_two_services()
+        self.manager.pause_all()
         self.assertEqual(service1.pause_func.call_count, 1)
         self.assertEqual(service2.pause_func.call_count, 1)
         self.assertEqual(service1.resume_func.call_count, 0)
         self.assertEqual(service2.resume_func.call_count, 0)
 
     def test_pause_all_with_some_failed(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
+        service1, service2 = self.register_two_services()
         service1.pause_func.side_effect = Exception(
             'Something failed in pause.')
-        service2 = manager.mock_service2
-        manager.pause_all()
+        self.manager.pause_all()
         self.assertEqual(service1.pause_func.call_count, 1)
         self.assertEqual(service2.pause_func.call_count, 1)
         self.assertEqual(service1.resume_func.call_count, 0)
@@ -309,28 +302,20 @@ class ServiceManagerTest(unittest.TestCase):
             'Failed to pause service "mock_service1".')
 
     def test_resume_all(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
-        service2 = manager.mock_service2
-        manager.pause_all()
-        manager.resume_all()
+        service1, service2 = self.register_two_services()
+        self.manager.pause_all()
+        self.manager.resume_all()
         self.assertEqual(service1.pause_func.call_count, 1)
         self.assertEqual(service2.pause_func.call_count, 1)
         self.assertEqual(service1.resume_func.call_count, 1)
         self.assertEqual(service2.resume_func.call_count, 1)
 
     def test_resume_all_with_some_failed(self):
-        manager = service_manager.ServiceManager(mock.MagicMock())
-        manager.register('mock_service1', MockService)
-        manager.register('mock_service2', MockService)
-        service1 = manager.mock_service1
+        service1, service2 = self.register_two_services()
         service1.resume_func.side_effect = Exception(
             'Something failed in resume.')
-        service2 = manager.mock_service2
-        manager.pause_all()
-        manager.resume_all()
+        self.manager.pause_all()
+        self.manager.resume_all()
         self.assertEqual(service1.pause_func.call_count, 1)
         self.assertEqual(service2.pause_func.call_count, 1)
         self.assertEqual(service1.resume_func.call_count, 1)
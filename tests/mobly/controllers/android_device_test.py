@@ -12,22 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from builtins import str as new_str
-
+import copy
+import functools
 import io
+import itertools
 import logging
 import mock
 import os
+import re
 import shutil
-import sys
 import tempfile
-import yaml
+import time
 
 from future.tests.base import unittest
 
+from mobly import utils
 from mobly.controllers import android_device
 from mobly.controllers.android_device_lib import adb
-from mobly.controllers.android_device_lib import snippet_client
+from mobly.controllers.android_device_lib import fastboot
 from mobly.controllers.android_device_lib.services import base_service
 from mobly.controllers.android_device_lib.services import logcat
 
@@ -35,43 +37,208 @@ from tests.lib import mock_android_device
 
 MOCK_SNIPPET_PACKAGE_NAME = 'com.my.snippet'
 
+# Serial of the mock device most tests run against.
+_MOCK_SERIAL = '1'
+
+# Short name for the mock used by the `android_device.create` tests.
+_mock_get_instances_with_configs = (
+    mock_android_device.get_instances_with_configs)
+
+# Expected error messages.
+_NO_VALID_CONFIG_RE = re.compile('No valid config found in: .*')
+_NO_DEVICE_WITH_LABEL_RE = re.compile(
+    'Could not find a target device that matches condition'
+    ": {'label': 'selected'}.")
+_NO_DEVICE_WITH_SERIAL_RE = re.compile(
+    'Could not find a target device that matches condition'
+    ": {'serial': 5}.")
+_TOO_MANY_DEVICES_RE = re.compile(
+    r"More than one device matched: \['0', '0'\]")
+_BUG_REPORT_FAIL_RE = re.compile('.* Failed to take bugreport.')
+_LOG_PATH_SERVICE_RUNNING_RE = re.compile(
+    '.* Cannot change `log_path` when there is service running.')
+_LOGS_EXIST_RE = re.compile('.* Logs already exist .*')
+_SERIAL_SERVICE_RUNNING_RE = re.compile(
+    '.* Cannot change device serial number when there is service running.')
+# Prefix of errors raised by the snippet management service of device '1'.
+_SNIPPET_ERROR_PREFIX = '<AndroidDevice|1>::Service<SnippetManagementService> '
+
+_MOCK_HOST_PORT = 12345
+
+# Raised by `is_boot_completed` while adb is not responsive during boot.
+_BOOT_COMPLETED_TIMEOUT_ERROR = adb.AdbTimeoutError(
+    ['adb', 'shell', 'getprop sys.boot_completed'], timeout=5, serial=1)
+
+# Marks attributes that did not exist before a test replaced them.
+_MISSING = object()
+
+
+def _replace_attribute(originals, obj, name, value):
+    """Sets an attribute of an object, recording its original value.
+
+    Args:
+        originals: list, where the original value is recorded for
+            `_restore_attributes`.
+        obj: the object to set the attribute on.
+        name: string, the name of the attribute.
+        value: the new value of the attribute.
+    """
+    originals.append((obj, name, getattr(obj, name, _MISSING)))
+    setattr(obj, name, value)
+
+
+def _restore_attributes(originals):
+    """Restores attributes recorded by `_replace_attribute`."""
+    for obj, name, value in reversed(originals):
+        if value is _MISSING:
+            delattr(obj, name)
+        else:
+            setattr(obj, name, value)
+    del originals[:]
+
+
+# Prototypes of the mock adb and fastboot proxies, keyed by serial. Each
+# `AndroidDevice` gets its own copy, so no test can see changes made by
+# another.
+_MOCK_ADB_PROXIES = {}
+_MOCK_FASTBOOT_PROXIES = {}
+
+
+def _copy_mock_adb_proxy(serial=_MOCK_SERIAL):
+    serial = str(serial)
+    if serial not in _MOCK_ADB_PROXIES:
+        _MOCK_ADB_PROXIES[serial] = mock_android_device.MockAdbProxy(serial)
+    return copy.copy(_MOCK_ADB_PROXIES[serial])
+
+
+def _copy_mock_fastboot_proxy(serial=_MOCK_SERIAL):
+    serial = str(serial)
+    if serial not in _MOCK_FASTBOOT_PROXIES:
+        _MOCK_FASTBOOT_PROXIES[serial] = mock_android_device.MockFastbootProxy(
+            serial)
+    return copy.copy(_MOCK_FASTBOOT_PROXIES[serial])
+
+
+_REGISTER_SERVICE_ERROR_MSG = 'Some error happened.'
+
+
+def _fail_to_register_service(*args, **kwargs):
+    raise android_device.Error(_REGISTER_SERVICE_ERROR_MSG)
+
+
+def _fail_if_called(*args, **kwargs):
+    raise Exception('Should not have called this.')
+
+
 # A mock SnippetClient used for testing snippet management logic.
-MockSnippetClient = mock.MagicMock()
+MockSnippetClient = mock.Mock()
 MockSnippetClient.package = MOCK_SNIPPET_PACKAGE_NAME
 
 
+def _patch_snippet_client(**kwargs):
+    """Patches the SnippetClient class used by AndroidDevice snippets.
+
+    Args:
+        **kwargs: passed through to `mock.patch`.
+    """
+    return mock.patch(
+        'mobly.controllers.android_device_lib.snippet_client.SnippetClient',
+        **kwargs)
+
+
+class MockService(base_service.BaseService):
+    """A service that records whether it was paused or resumed."""
+
+    def __init__(self, device, configs=None):
+        self._alive = False
+        self.pause_called = False
+        self.resume_called = False
+
+    @property
+    def is_alive(self):
+        return self._alive
+
+    def start(self, configs=None):
+        self._alive = True
+
+    def stop(self):
+        self._alive = False
+
+    def pause(self):
+        self._alive = False
+        self.pause_called = True
+
+    def resume(self):
+        self._alive = True
+        self.resume_called = True
+
+
 class AndroidDeviceTest(unittest.TestCase):
     """This test class has unit tests for the implementation of everything
     under mobly.controllers.android_device.
     """
 
+    @classmethod
+    def setUpClass(cls):
+        # Creates one temp dir for the whole class, each test gets its own
+        # sub-directory as `tmp_dir` in `setUp`.
+        cls._root_tmp_dir = tempfile.mkdtemp()
+        # Replace interactions with adb, fastboot, subprocesses and host ports
+        # for all tests. Plain assignment is much cheaper than `mock.patch`,
+        # and individual tests can still override these with `mock.patch`.
+        # Every `AndroidDevice` gets its own proxy copies, so these can stay
+        # in place for the whole class.
+        cls._class_attributes = []
+        _replace_attribute(cls._class_attributes, adb, 'AdbProxy',
+                           _copy_mock_adb_proxy)
+        _replace_attribute(cls._class_attributes, fastboot, 'FastbootProxy',
+                           _copy_mock_fastboot_proxy)
+        _replace_attribute(cls._class_attributes, utils,
+                           'start_standing_subprocess',
+                           lambda *args, **kwargs: 'process')
+        _replace_attribute(cls._class_attributes, utils,
+                           'stop_standing_subprocess',
+                           lambda *args, **kwargs: None)
+        # Snippet clients are mocked, so they never need a real port.
+        _replace_attribute(cls._class_attributes, utils,
+                           'get_available_host_port',
+                           lambda: _MOCK_HOST_PORT)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restores the replaced attributes and removes the temp dir.
+        """
+        _restore_attributes(cls._class_attributes)
+        shutil.rmtree(cls._root_tmp_dir)
+
     def setUp(self):
-        # Set log_path to logging since mobly logger setup is not called.
-        if not hasattr(logging, 'log_path'):
-            setattr(logging, 'log_path', '/tmp/logs')
-        # Creates a temp dir to be used by tests in this test class.
-        self.tmp_dir = tempfile.mkdtemp()
+        self.tmp_dir = os.path.join(self._root_tmp_dir, self._testMethodName)
+        os.mkdir(self.tmp_dir)
+        self._test_attributes = []
+        # Set log_path to logging since mobly logger setup is not called. Each
+        # test gets its own log dir so tests don't share any files and can run
+        # in parallel.
+        _replace_attribute(self._test_attributes, logging, 'log_path',
+                           self.tmp_dir)
+        # Expected log paths of the default mock device.
+        self.device_log_path = os.path.join(self.tmp_dir,
+                                            'AndroidDevice%s' % _MOCK_SERIAL)
+        self.bug_report_path = os.path.join(self.device_log_path,
+                                            'BugReports')
 
     def tearDown(self):
-        """Removes the temp dir.
+        """Restores the attributes replaced for the test.
         """
-        shutil.rmtree(self.tmp_dir)
+        _restore_attributes(self._test_attributes)
 
     # Tests for android_device module functions.
     # These tests use mock AndroidDevice instances.
 
-    @mock.patch.object(
+    @mock.patch.multiple(
         android_device,
-        'get_all_instances',
-        new=mock_android_device.get_all_instances)
-    @mock.patch.object(
-        android_device,
-        'list_adb_devices',
-        new=mock_android_device.list_adb_devices)
-    @mock.patch.object(
-        android_device,
-        'list_adb_devices_by_usb_id',
-        new=mock_android_device.list_adb_devices)
+        get_all_instances=mock_android_device.get_all_instances,
+        list_adb_devices=mock_android_device.list_adb_devices,
+        list_adb_devices_by_usb_id=mock_android_device.list_adb_devices)
     def test_create_with_pickup_all(self):
         pick_all_token = android_device.ANDROID_DEVICE_PICK_ALL_TOKEN
         actual_ads = android_device.create(pick_all_token)
@@ -79,51 +246,34 @@ class AndroidDeviceTest(unittest.TestCase):
                                     mock_android_device.get_mock_ads(5)):
             self.assertEqual(actual.serial, expected.serial)
 
-    @mock.patch.object(
-        android_device, 'get_instances', new=mock_android_device.get_instances)
-    @mock.patch.object(
-        android_device,
-        'list_adb_devices',
-        new=mock_android_device.list_adb_devices)
-    @mock.patch.object(
+    @mock.patch.multiple(
         android_device,
-        'list_adb_devices_by_usb_id',
-        new=mock_android_device.list_adb_devices)
+        get_instances=mock_android_device.get_instances,
+        list_adb_devices=mock_android_device.list_adb_devices,
+        list_adb_devices_by_usb_id=mock_android_device.list_adb_devices)
     def test_create_with_string_list(self):
         string_list = [u'1', '2']
         actual_ads = android_device.create(string_list)
         for actual_ad, expected_serial in zip(actual_ads, ['1', '2']):
             self.assertEqual(actual_ad.serial, expected_serial)
 
-    @mock.patch.object(
+    @mock.patch.multiple(
         android_device,
-        'get_instances_with_configs',
-        new=mock_android_device.get_instances_with_configs)
-    @mock.patch.object(
-        android_device,
-        'list_adb_devices',
-        new=mock_android_device.list_adb_devices)
-    @mock.patch.object(
-        android_device,
-        'list_adb_devices_by_usb_id',
-        new=mock_android_device.list_adb_devices)
+        get_instances_with_configs=_mock_get_instances_with_configs,
+        list_adb_devices=mock_android_device.list_adb_devices,
+        list_adb_devices_by_usb_id=mock_android_device.list_adb_devices)
     def test_create_with_dict_list(self):
         string_list = [{'serial': '1'}, {'serial': '2'}]
         actual_ads = android_device.create(string_list)
         for actual_ad, expected_serial in zip(actual_ads, ['1', '2']):
             self.assertEqual(actual_ad.serial, expected_serial)
 
-    @mock.patch.object(
-        android_device,
-        'get_instances_with_configs',
-        new=mock_android_device.get_instances_with_configs)
-    @mock.patch.object(
+    @mock.patch.multiple(
         android_device,
-        'list_adb_devices',
-        new=mock_android_device.list_adb_devices)
-    @mock.patch.object(
-        android_device, 'list_adb_devices_by_usb_id', return_value=['usb:1'])
-    def test_create_with_usb_id(self, mock_list_adb_devices_by_usb_id):
+        get_instances_with_configs=_mock_get_instances_with_configs,
+        list_adb_devices=mock_android_device.list_adb_devices,
+        list_adb_devices_by_usb_id=lambda: ['usb:1'])
+    def test_create_with_usb_id(self):
         string_list = [{'serial': '1'}, {'serial': '2'}, {'serial': 'usb:1'}]
         actual_ads = android_device.create(string_list)
         for actual_ad, expected_serial in zip(actual_ads, ['1', '2', 'usb:1']):
@@ -140,8 +290,8 @@ class AndroidDeviceTest(unittest.TestCase):
             android_device.create('HAHA')
 
     def test_create_with_no_valid_config(self):
-        expected_msg = 'No valid config found in: .*'
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaisesRegex(android_device.Error,
+                                    _NO_VALID_CONFIG_RE):
             android_device.create([1])
 
     def test_get_devices_success_with_extra_field(self):
@@ -157,9 +307,8 @@ class AndroidDeviceTest(unittest.TestCase):
 
     def test_get_devices_no_match(self):
         ads = mock_android_device.get_mock_ads(5)
-        expected_msg = ('Could not find a target device that matches condition'
-                        ": {'label': 'selected'}.")
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaisesRegex(android_device.Error,
+                                    _NO_DEVICE_WITH_LABEL_RE):
             selected_ads = android_device.get_devices(ads, label='selected')
 
     def test_get_device_success_with_serial(self):
@@ -180,73 +329,56 @@ class AndroidDeviceTest(unittest.TestCase):
 
     def test_get_device_no_match(self):
         ads = mock_android_device.get_mock_ads(5)
-        expected_msg = ('Could not find a target device that matches condition'
-                        ": {'serial': 5}.")
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaisesRegex(android_device.Error,
+                                    _NO_DEVICE_WITH_SERIAL_RE):
             ad = android_device.get_device(ads, serial=len(ads))
 
     def test_get_device_too_many_matches(self):
         ads = mock_android_device.get_mock_ads(5)
         target_serial = ads[1].serial = ads[0].serial
-        expected_msg = r"More than one device matched: \['0', '0'\]"
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaisesRegex(android_device.Error,
+                                    _TOO_MANY_DEVICES_RE):
             android_device.get_device(ads, serial=target_serial)
 
     def test_start_services_on_ads(self):
         """Makes sure when an AndroidDevice fails to start some services, all
         AndroidDevice objects get cleaned up.
         """
-        msg = 'Some error happened.'
         ads = mock_android_device.get_mock_ads(3)
-        ads[0].services.register = mock.MagicMock()
-        ads[0].services.stop_all = mock.MagicMock()
-        ads[1].services.register = mock.MagicMock()
-        ads[1].services.stop_all = mock.MagicMock()
-        ads[2].services.register = mock.MagicMock(
-            side_effect=android_device.Error(msg))
-        ads[2].services.stop_all = mock.MagicMock()
-        with self.assertRaisesRegex(android_device.Error, msg):
+        ads[0].services.register = mock.Mock()
+        ads[0].services.stop_all = mock.Mock()
+        ads[1].services.register = mock.Mock()
+        ads[1].services.stop_all = mock.Mock()
+        ads[2].services.register = _fail_to_register_service
+        ads[2].services.stop_all = mock.Mock()
+        with self.assertRaisesRegex(android_device.Error,
+                                    _REGISTER_SERVICE_ERROR_MSG):
             android_device._start_services_on_ads(ads)
-        ads[0].services.stop_all.assert_called_once_with()
-        ads[1].services.stop_all.assert_called_once_with()
-        ads[2].services.stop_all.assert_called_once_with()
+        for ad in ads:
+            ad.services.stop_all.assert_called_once_with()
 
     def test_start_services_on_ads_skip_logcat(self):
         ads = mock_android_device.get_mock_ads(3)
-        ads[0].services.logcat.start = mock.MagicMock()
-        ads[1].services.logcat.start = mock.MagicMock()
-        ads[2].services.logcat.start = mock.MagicMock(
-            side_effect=Exception('Should not have called this.'))
+        ads[0].services.logcat.start = mock.Mock()
+        ads[1].services.logcat.start = mock.Mock()
+        ads[2].services.logcat.start = _fail_if_called
         ads[2].skip_logcat = True
         android_device._start_services_on_ads(ads)
 
     def test_take_bug_reports(self):
         ads = mock_android_device.get_mock_ads(3)
         android_device.take_bug_reports(ads, 'test_something', 'sometime')
-        ads[0].take_bug_report.assert_called_once_with(
-            test_name='test_something',
-            begin_time='sometime',
-            destination=None)
-        ads[1].take_bug_report.assert_called_once_with(
-            test_name='test_something',
-            begin_time='sometime',
-            destination=None)
-        ads[2].take_bug_report.assert_called_once_with(
-            test_name='test_something',
-            begin_time='sometime',
-            destination=None)
+        for ad in ads:
+            ad.take_bug_report.assert_called_once_with(
+                test_name='test_something',
+                begin_time='sometime',
+                destination=None)
 
     # Tests for android_device.AndroidDevice class.
     # These tests mock out any interaction with the OS and real android device
     # in AndroidDeivce.
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    def test_AndroidDevice_instantiation(self, MockFastboot, MockAdbProxy):
+    def test_AndroidDevice_instantiation(self):
         """Verifies the AndroidDevice object's basic attributes are correctly
         set after instantiation.
         """
@@ -254,32 +386,18 @@ class AndroidDeviceTest(unittest.TestCase):
         ad = android_device.AndroidDevice(serial=mock_serial)
         self.assertEqual(ad.serial, '1')
         self.assertEqual(ad.model, 'fakemodel')
-        expected_lp = os.path.join(logging.log_path,
-                                   'AndroidDevice%s' % mock_serial)
-        self.assertEqual(ad.log_path, expected_lp)
+        self.assertEqual(ad.log_path, self.device_log_path)
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    def test_AndroidDevice_build_info(self, MockFastboot, MockAdbProxy):
+    def test_AndroidDevice_build_info(self):
         """Verifies the AndroidDevice object's basic attributes are correctly
         set after instantiation.
         """
-        ad = android_device.AndroidDevice(serial='1')
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         build_info = ad.build_info
         self.assertEqual(build_info['build_id'], 'AB42')
         self.assertEqual(build_info['build_type'], 'userdebug')
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    def test_AndroidDevice_device_info(self, MockFastboot, MockAdbProxy):
+    def test_AndroidDevice_device_info(self):
         ad = android_device.AndroidDevice(serial=1)
         device_info = ad.device_info
         self.assertEqual(device_info['serial'], '1')
@@ -292,436 +410,199 @@ class AndroidDeviceTest(unittest.TestCase):
         self.assertEqual(device_info['user_added_info']['sim_type'], 'Fi')
         self.assertEqual(device_info['user_added_info']['build_id'], 'CD42')
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    def test_AndroidDevice_serial_is_valid(self, MockFastboot, MockAdbProxy):
+    def test_AndroidDevice_serial_is_valid(self):
         """Verifies that the serial is a primitive string type and serializable.
         """
         ad = android_device.AndroidDevice(serial=1)
-        # In py2, checks that ad.serial is not the backported py3 str type,
-        # which is not dumpable by yaml in py2.
-        # In py3, new_str is equivalent to str, so this check is not
-        # appropirate in py3.
-        if sys.version_info < (3, 0):
-            self.assertFalse(isinstance(ad.serial, new_str))
         self.assertTrue(isinstance(ad.serial, str))
-        yaml.safe_dump(ad.serial)
+        # Only the exact builtin str type is serializable by yaml, subclasses
+        # are not.
+        self.assertIs(type(ad.serial), str)
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy(1))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy(1))
-    @mock.patch('mobly.utils.create_dir')
-    def test_AndroidDevice_take_bug_report(self, create_dir_mock,
-                                           FastbootProxy, MockAdbProxy):
+    @mock.patch('mobly.utils.get_current_epoch_time')
+    @mock.patch('mobly.logger.epoch_to_log_line_timestamp')
+    def test_AndroidDevice_take_bug_report(self,
+                                           epoch_to_log_line_timestamp_mock,
+                                           get_current_epoch_time_mock):
         """Verifies AndroidDevice.take_bug_report calls the correct adb command
         and writes the bugreport file to the correct path.
         """
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
-        output_path = ad.take_bug_report(
-            test_name='test_something', begin_time='sometime')
-        expected_path = os.path.join(
-            logging.log_path, 'AndroidDevice%s' % ad.serial, 'BugReports')
-        create_dir_mock.assert_called_with(expected_path)
-        self.assertEqual(output_path,
-                         os.path.join(expected_path,
-                                      'test_something,sometime,1.zip'))
-
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1', fail_br=True))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    def test_AndroidDevice_take_bug_report_fail(self, create_dir_mock,
-                                                FastbootProxy, MockAdbProxy):
+        get_current_epoch_time_mock.return_value = 1557446629606
+        epoch_to_log_line_timestamp_mock.return_value = '05-09 17:03:49.606'
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
+        expected_path = self.bug_report_path
+        dest = os.path.join(self.tmp_dir, 'destination')
+        # Each case is (args, kwargs, expected dir, expected file name).
+        cases = [
+            ((), {
+                'test_name': 'test_something',
+                'begin_time': 'sometime'
+            }, expected_path, 'test_something,sometime,1.zip'),
+            ((), {}, expected_path, 'bugreport,05-09_17-03-49.606,1.zip'),
+            ((), {
+                'test_name': 'test_something'
+            }, expected_path, 'test_something,05-09_17-03-49.606,1.zip'),
+            ((), {
+                'begin_time': 'sometime'
+            }, expected_path, 'bugreport,sometime,1.zip'),
+            (('test_something', 'sometime'), {}, expected_path,
+             'test_something,sometime,1.zip'),
+            ((), {
+                'test_name': 'test_something',
+                'begin_time': 'sometime',
+                'destination': dest
+            }, dest, 'test_something,sometime,1.zip'),
+        ]
+        for args, kwargs, expected_dir, expected_name in cases:
+            msg = 'take_bug_report(*%s, **%s)' % (args, kwargs)
+            epoch_to_log_line_timestamp_mock.reset_mock()
+            output_path = ad.take_bug_report(*args, **kwargs)
+            self.assertTrue(os.path.isdir(expected_dir), msg)
+            # The current time is only used when no begin time is given.
+            if 'begin_time' in kwargs or args:
+                expected_calls = []
+            else:
+                expected_calls = [mock.call(1557446629606)]
+            self.assertEqual(epoch_to_log_line_timestamp_mock.call_args_list,
+                             expected_calls, msg)
+            self.assertEqual(output_path,
+                             os.path.join(expected_dir, expected_name), msg)
+
+    @mock.patch(
+        'mobly.controllers.android_device_lib.adb.AdbProxy',
+        new=lambda *args: mock_android_device.MockAdbProxy(
+            _MOCK_SERIAL, fail_br=True))
+    def test_AndroidDevice_take_bug_report_fail(self):
         """Verifies AndroidDevice.take_bug_report writes out the correct message
         when taking bugreport fails.
         """
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
-        expected_msg = '.* Failed to take bugreport.'
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
+        with self.assertRaisesRegex(android_device.Error, _BUG_REPORT_FAIL_RE):
             ad.take_bug_report(
                 test_name='test_something', begin_time='sometime')
 
     @mock.patch(
         'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    @mock.patch('mobly.utils.get_current_epoch_time')
-    @mock.patch('mobly.logger.epoch_to_log_line_timestamp')
-    def test_AndroidDevice_take_bug_report_without_args(
-            self, epoch_to_log_line_timestamp_mock,
-            get_current_epoch_time_mock, create_dir_mock, FastbootProxy,
-            MockAdbProxy):
-        get_current_epoch_time_mock.return_value = 1557446629606
-        epoch_to_log_line_timestamp_mock.return_value = '05-09 17:03:49.606'
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
-        output_path = ad.take_bug_report()
-        expected_path = os.path.join(
-            logging.log_path, 'AndroidDevice%s' % ad.serial, 'BugReports')
-        create_dir_mock.assert_called_with(expected_path)
-        epoch_to_log_line_timestamp_mock.assert_called_once_with(1557446629606)
-        self.assertEqual(output_path,
-                         os.path.join(expected_path,
-                                      'bugreport,05-09_17-03-49.606,1.zip'))
-
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    @mock.patch('mobly.utils.get_current_epoch_time')
-    @mock.patch('mobly.logger.epoch_to_log_line_timestamp')
-    def test_AndroidDevice_take_bug_report_with_only_test_name(
-            self, epoch_to_log_line_timestamp_mock,
-            get_current_epoch_time_mock, create_dir_mock, FastbootProxy,
-            MockAdbProxy):
-        get_current_epoch_time_mock.return_value = 1557446629606
-        epoch_to_log_line_timestamp_mock.return_value = '05-09 17:03:49.606'
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
-        output_path = ad.take_bug_report(test_name='test_something')
-        expected_path = os.path.join(
-            logging.log_path, 'AndroidDevice%s' % ad.serial, 'BugReports')
-        create_dir_mock.assert_called_with(expected_path)
-        epoch_to_log_line_timestamp_mock.assert_called_once_with(1557446629606)
-        self.assertEqual(
-            output_path,
-            os.path.join(expected_path,
-                         'test_something,05-09_17-03-49.606,1.zip'))
-
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy(1))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy(1))
-    @mock.patch('mobly.utils.create_dir')
-    def test_AndroidDevice_take_bug_report_with_only_begin_time(
-            self, create_dir_mock, FastbootProxy, MockAdbProxy):
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
-        output_path = ad.take_bug_report(begin_time='sometime')
-        expected_path = os.path.join(
-            logging.log_path, 'AndroidDevice%s' % ad.serial, 'BugReports')
-        create_dir_mock.assert_called_with(expected_path)
-        self.assertEqual(output_path,
-                         os.path.join(expected_path,
-                                      'bugreport,sometime,1.zip'))
-
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy(1))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy(1))
-    @mock.patch('mobly.utils.create_dir')
-    def test_AndroidDevice_take_bug_report_with_positional_args(
-            self, create_dir_mock, FastbootProxy, MockAdbProxy):
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
-        output_path = ad.take_bug_report('test_something', 'sometime')
-        expected_path = os.path.join(
-            logging.log_path, 'AndroidDevice%s' % ad.serial, 'BugReports')
-        create_dir_mock.assert_called_with(expected_path)
-        self.assertEqual(output_path,
-                         os.path.join(expected_path,
-                                      'test_something,sometime,1.zip'))
-
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    def test_AndroidDevice_take_bug_report_with_destination(
-            self, create_dir_mock, FastbootProxy, MockAdbProxy):
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
-        dest = tempfile.gettempdir()
-        output_path = ad.take_bug_report(
-            test_name="test_something",
-            begin_time="sometime",
-            destination=dest)
-        expected_path = os.path.join(dest)
-        create_dir_mock.assert_called_with(expected_path)
-        self.assertEqual(output_path,
-                         os.path.join(expected_path,
-                                      'test_something,sometime,1.zip'))
-
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy(
-            '1', fail_br_before_N=True))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    def test_AndroidDevice_take_bug_report_fallback(
-            self, create_dir_mock, FastbootProxy, MockAdbProxy):
+        new=lambda *args: mock_android_device.MockAdbProxy(
+            _MOCK_SERIAL, fail_br_before_N=True))
+    def test_AndroidDevice_take_bug_report_fallback(self):
         """Verifies AndroidDevice.take_bug_report falls back to traditional
         bugreport on builds that do not have bugreportz.
         """
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         output_path = ad.take_bug_report(
             test_name='test_something', begin_time='sometime')
-        expected_path = os.path.join(
-            logging.log_path, 'AndroidDevice%s' % ad.serial, 'BugReports')
-        create_dir_mock.assert_called_with(expected_path)
-        self.assertEqual(output_path,
-                         os.path.join(expected_path,
-                                      'test_something,sometime,1.txt'))
+        self.assertTrue(os.path.isdir(self.bug_report_path))
+        self.assertEqual(
+            output_path,
+            os.path.join(self.bug_report_path,
+                         'test_something,sometime,1.txt'))
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_change_log_path(self, stop_proc_mock,
-                                           start_proc_mock, FastbootProxy,
-                                           MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    def test_AndroidDevice_change_log_path(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         old_path = ad.log_path
-        new_log_path = tempfile.mkdtemp()
+        new_log_path = os.path.join(self.tmp_dir, 'new_log_path')
+        os.mkdir(new_log_path)
         ad.log_path = new_log_path
         self.assertTrue(os.path.exists(new_log_path))
         self.assertFalse(os.path.exists(old_path))
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_change_log_path_no_log_exists(
-            self, stop_proc_mock, start_proc_mock, FastbootProxy,
-            MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    def test_AndroidDevice_change_log_path_no_log_exists(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         old_path = ad.log_path
-        new_log_path = tempfile.mkdtemp()
+        new_log_path = os.path.join(self.tmp_dir, 'new_log_path')
+        os.mkdir(new_log_path)
         ad.log_path = new_log_path
         self.assertTrue(os.path.exists(new_log_path))
         self.assertFalse(os.path.exists(old_path))
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('127.0.0.1:5557'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('127.0.0.1:5557'))
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_with_reserved_character_in_serial_log_path(
-            self, stop_proc_mock, start_proc_mock, FastbootProxy,
-            MockAdbProxy):
+    def test_AndroidDevice_with_reserved_character_in_serial_log_path(self):
         ad = android_device.AndroidDevice(serial='127.0.0.1:5557')
         base_log_path = os.path.basename(ad.log_path)
         self.assertEqual(base_log_path, 'AndroidDevice127.0.0.1-5557')
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_change_log_path_with_service(
-            self, stop_proc_mock, start_proc_mock, creat_dir_mock,
-            FastbootProxy, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    def test_AndroidDevice_change_log_path_with_service(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.services.register('logcat', logcat.Logcat)
-        new_log_path = tempfile.mkdtemp()
-        expected_msg = '.* Cannot change `log_path` when there is service running.'
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        new_log_path = os.path.join(self.tmp_dir, 'new_log_path')
+        os.mkdir(new_log_path)
+        with self.assertRaisesRegex(android_device.Error,
+                                    _LOG_PATH_SERVICE_RUNNING_RE):
             ad.log_path = new_log_path
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_change_log_path_with_existing_file(
-            self, stop_proc_mock, start_proc_mock, creat_dir_mock,
-            FastbootProxy, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
-        new_log_path = tempfile.mkdtemp()
+    def test_AndroidDevice_change_log_path_with_existing_file(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
+        new_log_path = os.path.join(self.tmp_dir, 'new_log_path')
+        os.mkdir(new_log_path)
         new_file_path = os.path.join(new_log_path, 'file.txt')
         with io.open(new_file_path, 'w', encoding='utf-8') as f:
             f.write(u'hahah.')
-        expected_msg = '.* Logs already exist .*'
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaisesRegex(android_device.Error, _LOGS_EXIST_RE):
             ad.log_path = new_log_path
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_update_serial(self, stop_proc_mock, start_proc_mock,
-                                         creat_dir_mock, FastbootProxy,
-                                         MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    def test_AndroidDevice_update_serial(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.update_serial('2')
         self.assertEqual(ad.serial, '2')
         self.assertEqual(ad.debug_tag, ad.serial)
         self.assertEqual(ad.adb.serial, ad.serial)
         self.assertEqual(ad.fastboot.serial, ad.serial)
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch('mobly.utils.create_dir')
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_update_serial_with_service_running(
-            self, stop_proc_mock, start_proc_mock, creat_dir_mock,
-            FastbootProxy, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    def test_AndroidDevice_update_serial_with_service_running(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.services.register('logcat', logcat.Logcat)
-        expected_msg = '.* Cannot change device serial number when there is service running.'
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaisesRegex(android_device.Error,
+                                    _SERIAL_SERVICE_RUNNING_RE):
             ad.update_serial('2')
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient')
-    @mock.patch('mobly.utils.get_available_host_port')
-    def test_AndroidDevice_load_snippet(self, MockGetPort, MockSnippetClient,
-                                        MockFastboot, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    @_patch_snippet_client(new=mock.MagicMock())
+    def test_AndroidDevice_load_snippet(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
         self.assertTrue(hasattr(ad, 'snippet'))
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient')
-    @mock.patch('mobly.utils.get_available_host_port')
-    def test_AndroidDevice_getattr(self, MockGetPort, MockSnippetClient,
-                                   MockFastboot, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    @_patch_snippet_client(new=mock.MagicMock())
+    def test_AndroidDevice_getattr(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
         value = {'value': 42}
         actual_value = getattr(ad, 'some_attr', value)
         self.assertEqual(actual_value, value)
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient',
-        return_value=MockSnippetClient)
-    @mock.patch('mobly.utils.get_available_host_port')
-    def test_AndroidDevice_load_snippet_dup_package(
-            self, MockGetPort, MockSnippetClient, MockFastboot, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    @_patch_snippet_client(new=lambda **kwargs: MockSnippetClient)
+    def test_AndroidDevice_load_snippet_dup_package(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
-        expected_msg = ('Snippet package "%s" has already been loaded under '
-                        'name "snippet".') % MOCK_SNIPPET_PACKAGE_NAME
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaises(android_device.Error) as cm:
             ad.load_snippet('snippet2', MOCK_SNIPPET_PACKAGE_NAME)
-
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient',
-        return_value=MockSnippetClient)
-    @mock.patch('mobly.utils.get_available_host_port')
-    def test_AndroidDevice_load_snippet_dup_snippet_name(
-            self, MockGetPort, MockSnippetClient, MockFastboot, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+        # The service reports this error with its own repr as the prefix.
+        self.assertTrue(
+            str(cm.exception).endswith(
+                'Snippet package "%s" has already been loaded under name '
+                '"snippet".' % MOCK_SNIPPET_PACKAGE_NAME))
+
+    @_patch_snippet_client(new=lambda **kwargs: MockSnippetClient)
+    def test_AndroidDevice_load_snippet_dup_snippet_name(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
-        expected_msg = '.* Attribute "snippet" already exists, please use a different name.'
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+        with self.assertRaises(android_device.Error) as cm:
             ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME + 'haha')
+        self.assertEqual(
+            str(cm.exception), _SNIPPET_ERROR_PREFIX +
+            'Attribute "snippet" already exists, please use a different name.')
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient')
-    @mock.patch('mobly.utils.get_available_host_port')
-    def test_AndroidDevice_load_snippet_dup_attribute_name(
-            self, MockGetPort, MockSnippetClient, MockFastboot, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
-        expected_msg = ('Attribute "%s" already exists, please use a different'
-                        ' name') % 'adb'
-        with self.assertRaisesRegex(android_device.Error, expected_msg):
+    @_patch_snippet_client(new=mock.MagicMock())
+    def test_AndroidDevice_load_snippet_dup_attribute_name(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
+        with self.assertRaises(android_device.Error) as cm:
             ad.load_snippet('adb', MOCK_SNIPPET_PACKAGE_NAME)
+        self.assertEqual(
+            str(cm.exception), _SNIPPET_ERROR_PREFIX +
+            'Attribute "adb" already exists, please use a different name.')
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient')
-    @mock.patch('mobly.utils.get_available_host_port')
+    @_patch_snippet_client()
     def test_AndroidDevice_load_snippet_start_app_fails(
-            self, MockGetPort, MockSnippetClient, MockFastboot, MockAdbProxy):
+            self, MockSnippetClient):
         """Verifies that the correct exception is raised if start app failed.
 
         It's possible that the `stop_app` call as part of the start app failure
@@ -733,61 +614,38 @@ class AndroidDeviceTest(unittest.TestCase):
             side_effect=expected_e)
         MockSnippetClient.stop_app = mock.Mock(
             side_effect=Exception('stop failed.'))
-        ad = android_device.AndroidDevice(serial='1')
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         try:
             ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
         except Exception as e:
             assertIs(e, expected_e)
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient')
-    @mock.patch('mobly.utils.get_available_host_port')
-    def test_AndroidDevice_unload_snippet(self, MockGetPort, MockSnippetClient,
-                                          MockFastboot, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    @_patch_snippet_client(new=mock.MagicMock())
+    def test_AndroidDevice_unload_snippet(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
         ad.unload_snippet('snippet')
-        self.assertFalse(hasattr(ad, 'snippet'))
-        with self.assertRaisesRegex(
-                android_device.SnippetError,
-                '<AndroidDevice|1> No snippet registered with name "snippet"'):
+        self.assertIsNone(ad.services.snippets.get_snippet_client('snippet'))
+        with self.assertRaises(android_device.SnippetError) as cm:
             ad.unload_snippet('snippet')
+        self.assertEqual(
+            str(cm.exception), _SNIPPET_ERROR_PREFIX +
+            'No snippet client is registered with name "snippet".')
         # Loading the same snippet again should succeed
         ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
-        self.assertTrue(hasattr(ad, 'snippet'))
+        self.assertIsNotNone(
+            ad.services.snippets.get_snippet_client('snippet'))
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.snippet_client.SnippetClient')
-    @mock.patch('mobly.utils.get_available_host_port')
-    def test_AndroidDevice_snippet_cleanup(
-            self, MockGetPort, MockSnippetClient, MockFastboot, MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
+    @_patch_snippet_client(new=mock.MagicMock())
+    def test_AndroidDevice_snippet_cleanup(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.services.start_all()
         ad.load_snippet('snippet', MOCK_SNIPPET_PACKAGE_NAME)
         ad.unload_snippet('snippet')
-        self.assertFalse(hasattr(ad, 'snippet'))
+        self.assertIsNone(ad.services.snippets.get_snippet_client('snippet'))
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    def test_AndroidDevice_debug_tag(self, MockFastboot, MockAdbProxy):
-        mock_serial = '1'
-        ad = android_device.AndroidDevice(serial=mock_serial)
+    def test_AndroidDevice_debug_tag(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         self.assertEqual(ad.debug_tag, '1')
         try:
             raise android_device.DeviceError(ad, 'Something')
@@ -805,43 +663,8 @@ class AndroidDeviceTest(unittest.TestCase):
         except Exception as e:
             self.assertEqual("(<AndroidDevice|Mememe>, 'Something')", str(e))
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_handle_usb_disconnect(self, stop_proc_mock,
-                                                 start_proc_mock,
-                                                 FastbootProxy, MockAdbProxy):
-        class MockService(base_service.BaseService):
-            def __init__(self, device, configs=None):
-                self._alive = False
-                self.pause_called = False
-                self.resume_called = False
-
-            @property
-            def is_alive(self):
-                return self._alive
-
-            def start(self, configs=None):
-                self._alive = True
-
-            def stop(self):
-                self._alive = False
-
-            def pause(self):
-                self._alive = False
-                self.pause_called = True
-
-            def resume(self):
-                self._alive = True
-                self.resume_called = True
-
-        ad = android_device.AndroidDevice(serial='1')
+    def test_AndroidDevice_handle_usb_disconnect(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.services.start_all()
         ad.services.register('mock_service', MockService)
         with ad.handle_usb_disconnect():
@@ -851,42 +674,8 @@ class AndroidDeviceTest(unittest.TestCase):
         self.assertTrue(ad.services.is_any_alive)
         self.assertTrue(ad.services.mock_service.resume_called)
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.utils.start_standing_subprocess', return_value='process')
-    @mock.patch('mobly.utils.stop_standing_subprocess')
-    def test_AndroidDevice_handle_reboot(self, stop_proc_mock, start_proc_mock,
-                                         FastbootProxy, MockAdbProxy):
-        class MockService(base_service.BaseService):
-            def __init__(self, device, configs=None):
-                self._alive = False
-                self.pause_called = False
-                self.resume_called = False
-
-            @property
-            def is_alive(self):
-                return self._alive
-
-            def start(self, configs=None):
-                self._alive = True
-
-            def stop(self):
-                self._alive = False
-
-            def pause(self):
-                self._alive = False
-                self.pause_called = True
-
-            def resume(self):
-                self._alive = True
-                self.resume_called = True
-
-        ad = android_device.AndroidDevice(serial='1')
+    def test_AndroidDevice_handle_reboot(self):
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
         ad.services.start_all()
         ad.services.register('mock_service', MockService)
         with ad.handle_reboot():
@@ -896,54 +685,42 @@ class AndroidDeviceTest(unittest.TestCase):
         self.assertTrue(ad.services.is_any_alive)
         self.assertFalse(ad.services.mock_service.resume_called)
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device.AndroidDevice.is_boot_completed',
-        side_effect=[False, False, adb.AdbTimeoutError(
-            ['adb', 'shell', 'getprop sys.boot_completed'],
-            timeout=5, serial=1), True])
-    @mock.patch('time.sleep', return_value=None)
-    @mock.patch('time.time', side_effect=[0, 5, 10, 15, 20, 25, 30])
-    def test_AndroidDevice_wait_for_completion_completed(
-            self, MockTime, MockSleep, MockIsBootCompleted, FastbootProxy,
-            MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
-        raised = False
-        try:
-            ad.wait_for_boot_completion()
-        except (adb.AdbError, adb.AdbTimeoutError):
-            raised = True
-        self.assertFalse(raised, 'adb.AdbError or adb.AdbTimeoutError exception raised but not handled.')
+    def _wait_for_boot_completion(self, boot_results, timeout):
+        """Calls `wait_for_boot_completion` with a fake clock.
 
-    @mock.patch(
-        'mobly.controllers.android_device_lib.adb.AdbProxy',
-        return_value=mock_android_device.MockAdbProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device_lib.fastboot.FastbootProxy',
-        return_value=mock_android_device.MockFastbootProxy('1'))
-    @mock.patch(
-        'mobly.controllers.android_device.AndroidDevice.is_boot_completed',
-        side_effect=[False, False, adb.AdbTimeoutError(
-            ['adb', 'shell', 'getprop sys.boot_completed'],
-            timeout=5, serial=1), False, False, False, False])
-    @mock.patch('time.sleep', return_value=None)
-    @mock.patch('time.time', side_effect=[0, 5, 10, 15, 20, 25, 30])
-    def test_AndroidDevice_wait_for_completion_never_boot(
-            self, MockTime, MockSleep, MockIsBootCompleted, FastbootProxy,
-            MockAdbProxy):
-        ad = android_device.AndroidDevice(serial='1')
-        raised = False
-        try:
-            with self.assertRaises(android_device.DeviceError):
-                ad.wait_for_boot_completion(timeout=20)
-        except (adb.AdbError, adb.AdbTimeoutError):
-            raised = True
-        self.assertFalse(raised, 'adb.AdbError or adb.AdbTimeoutError exception raised but not handled.')
+        The clock moves 5s per reading and sleeping returns at once.
+
+        Args:
+            boot_results: list, what each `is_boot_completed` call returns or
+                raises, in order.
+            timeout: float, the timeout for `wait_for_boot_completion`.
+        """
+        _replace_attribute(self._test_attributes, time, 'time',
+                           functools.partial(next, itertools.count(0, 5)))
+        _replace_attribute(self._test_attributes, time, 'sleep',
+                           lambda seconds: None)
+        ad = android_device.AndroidDevice(serial=_MOCK_SERIAL)
+        with mock.patch.object(
+                android_device.AndroidDevice,
+                'is_boot_completed',
+                side_effect=boot_results):
+            try:
+                ad.wait_for_boot_completion(timeout=timeout)
+            except (adb.AdbError, adb.AdbTimeoutError):
+                self.fail('adb.AdbError or adb.AdbTimeoutError exception '
+                          'raised but not handled.')
+
+    def test_AndroidDevice_wait_for_completion_completed(self):
+        self._wait_for_boot_completion(
+            [False, False, _BOOT_COMPLETED_TIMEOUT_ERROR, True],
+            android_device.DEFAULT_TIMEOUT_BOOT_COMPLETION_SECOND)
+
+    def test_AndroidDevice_wait_for_completion_never_boot(self):
+        with self.assertRaises(android_device.DeviceError):
+            self._wait_for_boot_completion([
+                False, False, _BOOT_COMPLETED_TIMEOUT_ERROR, False, False,
+                False, False
+            ], 20)
 
 
 if __name__ == '__main__':
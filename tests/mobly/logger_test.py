@@ -17,6 +17,11 @@ import pytz
 
 from mobly import logger
 
+_UTC = pytz.utc
+# An epoch time in ms and its log line timestamp in UTC.
+_EPOCH_MS = 1469134262116
+_EXPECTED_TS = "07-21 20:51:02.116"
+
 
 class LoggerTest(unittest.TestCase):
     """Verifies code in mobly.logger module.
@@ -24,20 +29,21 @@ class LoggerTest(unittest.TestCase):
 
     def test_epoch_to_log_line_timestamp(self):
         actual_stamp = logger.epoch_to_log_line_timestamp(
-            1469134262116, time_zone=pytz.utc)
-        self.assertEqual("07-21 20:51:02.116", actual_stamp)
+            _EPOCH_MS, time_zone=_UTC)
+        self.assertEqual(_EXPECTED_TS, actual_stamp)
 
     def test_is_valid_logline_timestamp(self):
-        self.assertTrue(
-            logger.is_valid_logline_timestamp("06-21 17:44:42.336"))
-
-    def test_is_valid_logline_timestamp_when_wrong_length(self):
-        self.assertFalse(
-            logger.is_valid_logline_timestamp("  06-21 17:44:42.336"))
-
-    def test_is_valid_logline_timestamp_when_invalid_content(self):
-        self.assertFalse(
-            logger.is_valid_logline_timestamp("------------------"))
+        cases = [
+            ("06-21 17:44:42.336", True),
+            # Wrong length.
+            ("  06-21 17:44:42.336", False),
+            # Invalid content.
+            ("------------------", False),
+        ]
+        for timestamp, expected in cases:
+            self.assertIs(
+                logger.is_valid_logline_timestamp(timestamp), expected,
+                'Timestamp: "%s"' % timestamp)
 
 
 if __name__ == "__main__":